@@ -14,8 +14,12 @@ API_CONFIG = {
 }
 
 # Request Configuration
+# The defaults keep the original pace of about one request per second against the
+# third-party server; higher rates have not been measured as acceptable, raise with care
 REQUEST_CONFIG = {
-    'delay': 1.0,        # Request interval (seconds)
+    'rate_limit': 1.0,   # Maximum requests per second
+    'rate_burst': 1,     # Requests allowed in a burst
+    'max_workers': 4,    # Concurrent game downloads
     'max_retries': 3,    # Maximum retry attempts
     'retry_delay': 2,    # Retry interval multiplier
 }
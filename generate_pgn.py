@@ -8,12 +8,21 @@ Reads all tournament data from the data folder and generates PGN files containin
 All games from each round are placed in one PGN file, including standard format header information and game moves.
 """
 
-import json
 import os
+import re
+import functools
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from itertools import count, repeat
 from pathlib import Path
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, Tuple
 import logging
 
+# Prefer orjson for faster decoding, fall back to the standard library
+try:
+    from orjson import loads as json_loads
+except ImportError:
+    from json import loads as json_loads
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -21,6 +30,17 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Precomputed chessbase clock tags for 0 to 3 hours, clock values repeat heavily within a game
+_CLK = {i: f"{{[%clk {i // 3600:02d}:{i % 3600 // 60:02d}:{i % 60:02d}]}}" for i in range(10801)}
+
+# Tournament time control as published by LiveChessCloud, e.g. "25m+10s"
+_TIME_CONTROL_RE = re.compile(r'(\d+)m\+(\d+)s')
+
+# Rounds with at least this many games read their game files in parallel
+_PARALLEL_READ_MIN_GAMES = 32
+# Reader threads per generator, shared out between the render processes of generate_tournament_pgn
+_PARALLEL_READ_WORKERS = 16
+
 
 class PGNGenerator:
     """PGN Generator"""
@@ -37,39 +57,110 @@ class PGNGenerator:
         self.rounds_dir = self.data_dir / "rounds"
         self.games_dir = self.data_dir / "games"
         
+        # Plain string prefixes for building file paths in per-file loads
+        self._rounds_base = str(self.rounds_dir) + os.sep
+        self._games_base = str(self.games_dir) + os.sep
+        
+        # Tournament info cached by get_tournament_info
+        self._tournament_info: Optional[Dict[str, Any]] = None
+        
+        # Threads used by load_round_games for large rounds
+        self.read_workers = _PARALLEL_READ_WORKERS
+        
+        # File names in the rounds and games directories, scanned lazily by _ensure_index
+        self._round_files: Optional[frozenset] = None
+        self._game_files: Optional[frozenset] = None
+        
     def load_tournament_info(self) -> Optional[Dict[str, Any]]:
         """Load tournament information"""
         try:
-            info_file = self.tournament_dir / "info.json"
-            if info_file.exists():
-                with open(info_file, 'r', encoding='utf-8') as f:
-                    return json.load(f)
-        except Exception as e:
+            with open(self.tournament_dir / "info.json", 'rb') as f:
+                return json_loads(f.read())
+        except FileNotFoundError:
+            pass
+        except (ValueError, OSError) as e:
             logger.error(f"Failed to load tournament info: {e}")
         return None
     
+    def get_tournament_info(self) -> Optional[Dict[str, Any]]:
+        """Load tournament information once and reuse it"""
+        if self._tournament_info is None:
+            self._tournament_info = self.load_tournament_info()
+        return self._tournament_info
+    
+    def refresh_index(self):
+        """Re-scan the rounds and games directories, needed if files appear after the first load"""
+        self._round_files = self._scan_dir(self.rounds_dir)
+        self._game_files = self._scan_dir(self.games_dir)
+    
+    def _ensure_index(self):
+        """Build the file name index on first use"""
+        if self._game_files is None:
+            self.refresh_index()
+    
+    @staticmethod
+    def _scan_dir(directory: Path) -> frozenset:
+        """List the file names of a directory with a single scandir"""
+        try:
+            with os.scandir(directory) as entries:
+                return frozenset(entry.name for entry in entries)
+        except FileNotFoundError:
+            return frozenset()
+        except OSError as e:
+            logger.error(f"Failed to scan directory {directory}: {e}")
+            return frozenset()
+    
     def load_round_data(self, round_number: int) -> Optional[Dict[str, Any]]:
         """Load specified round data"""
+        self._ensure_index()
+        round_name = f"round_{round_number}_index.json"
+        if round_name not in self._round_files:
+            return None
         try:
-            round_file = self.rounds_dir / f"round_{round_number}_index.json"
-            if round_file.exists():
-                with open(round_file, 'r', encoding='utf-8') as f:
-                    return json.load(f)
-        except Exception as e:
+            with open(self._rounds_base + round_name, 'rb') as f:
+                return json_loads(f.read())
+        except FileNotFoundError:
+            pass
+        except (ValueError, OSError) as e:
             logger.error(f"Failed to load round {round_number} data: {e}")
         return None
     
     def load_game_data(self, round_number: int, game_number: int) -> Optional[Dict[str, Any]]:
         """Load specified game data"""
+        self._ensure_index()
+        game_name = f"round_{round_number}_game_{game_number}.json"
+        if game_name not in self._game_files:
+            return None
         try:
-            game_file = self.games_dir / f"round_{round_number}_game_{game_number}.json"
-            if game_file.exists():
-                with open(game_file, 'r', encoding='utf-8') as f:
-                    return json.load(f)
-        except Exception as e:
+            with open(self._games_base + game_name, 'rb') as f:
+                return json_loads(f.read())
+        except FileNotFoundError:
+            pass
+        except (ValueError, OSError) as e:
             logger.error(f"Failed to load round {round_number} game {game_number} data: {e}")
         return None
     
+    def load_round_games(self, round_number: int, total_games: int) -> List[Optional[Dict[str, Any]]]:
+        """
+        Load all game data of a round
+        
+        Large rounds are read by a thread pool so the many small file reads overlap.
+        
+        Args:
+            round_number: Round number
+            total_games: Number of games in the round
+            
+        Returns:
+            Game data in game order, None for games that could not be loaded
+        """
+        game_numbers = range(1, total_games + 1)
+        if total_games < _PARALLEL_READ_MIN_GAMES or self.read_workers <= 1:
+            return [self.load_game_data(round_number, game_num) for game_num in game_numbers]
+        
+        self._ensure_index()
+        with ThreadPoolExecutor(max_workers=self.read_workers) as executor:
+            return list(executor.map(self.load_game_data, repeat(round_number), game_numbers))
+    
     def get_player_name(self, player_data: Dict[str, Any]) -> str:
         """Get complete player name"""
         fname = player_data.get('fname', '') or ''
@@ -87,7 +178,8 @@ class PGNGenerator:
         
         return ' '.join(name_parts) if name_parts else 'Unknown'
     
-    def format_time_chessbase(self, time_str: str) -> str:
+    @staticmethod
+    def format_time_chessbase(time_str: str) -> str:
         """
         Convert raw time string (e.g., 1518+2) to chessbase format {[%clk hh:mm:ss]}
         """
@@ -100,9 +192,11 @@ class PGNGenerator:
             seconds = int(main_time)
         except Exception:
             return ''
-        h = seconds // 3600
-        m = (seconds % 3600) // 60
-        s = seconds % 60
+        clk = _CLK.get(seconds)
+        if clk is not None:
+            return clk
+        h, rem = divmod(seconds, 3600)
+        m, s = divmod(rem, 60)
         return f"{{[%clk {h:02d}:{m:02d}:{s:02d}]}}"
 
     def format_moves_with_time(self, moves_data: Any) -> str:
@@ -124,69 +218,34 @@ class PGNGenerator:
         if not moves_list:
             return ""
         
-        # Reorganize moves, group every two moves (white + black)
-        formatted_moves = []
-        i = 0
-        move_number = 1
+        # Split every half-move into move text and raw clock up front
+        clock = _clock_tag
+        parts = [move.split(' ', 1) if isinstance(move, str) and ' ' in move else (str(move), None)
+                 for move in moves_list]
+        half_moves = [move if time_part is None else f"{move} {clock(time_part)}"
+                      for move, time_part in parts]
         
-        while i < len(moves_list):
-            move_line = f"{move_number}."
-            
-            # White move
-            if i < len(moves_list):
-                white_move = moves_list[i]
-                if isinstance(white_move, str) and ' ' in white_move:
-                    move_part, time_part = white_move.split(' ', 1)
-                    clk = self.format_time_chessbase(time_part)
-                    move_line += f"{move_part} {clk}"
-                else:
-                    move_line += str(white_move)
-                i += 1
-            
-            # Black move
-            if i < len(moves_list):
-                move_line += " "
-                black_move = moves_list[i]
-                if isinstance(black_move, str) and ' ' in black_move:
-                    move_part, time_part = black_move.split(' ', 1)
-                    clk = self.format_time_chessbase(time_part)
-                    move_line += f"{move_part} {clk}"
-                else:
-                    move_line += str(black_move)
-                i += 1
-            
-            formatted_moves.append(move_line)
-            move_number += 1
+        # Group every two moves (white + black), a trailing white move gets its own line
+        formatted_moves = ['%d.%s %s' % turn
+                           for turn in zip(count(1), half_moves[0::2], half_moves[1::2])]
+        if len(half_moves) % 2:
+            formatted_moves.append('%d.%s' % (len(formatted_moves) + 1, half_moves[-1]))
         
         return '\n'.join(formatted_moves)
     
-    def format_time_control(self, timecontrol_str: str) -> str:
+    @staticmethod
+    @functools.lru_cache(maxsize=16)
+    def format_time_control(timecontrol_str: str) -> str:
         """
         Format time control to standard format, e.g., [TimeControl "2500+10"]
         """
         if not timecontrol_str or timecontrol_str == "Unknown":
             return "2500+10"  # Default value
         
-        # Try to parse "25m+10s" format
-        try:
-            if 'm' in timecontrol_str and 's' in timecontrol_str:
-                # Remove all spaces
-                timecontrol_str = timecontrol_str.replace(' ', '')
-                # Split minutes and seconds
-                if '+' in timecontrol_str:
-                    main_part, increment_part = timecontrol_str.split('+')
-                    # Extract minutes
-                    minutes = int(main_part.replace('m', ''))
-                    # Extract increment seconds
-                    increment = int(increment_part.replace('s', ''))
-                    # Convert to seconds format
-                    return f"{minutes*60}+{increment}"
-                else:
-                    # Only main time, no increment
-                    minutes = int(timecontrol_str.replace('m', ''))
-                    return f"{minutes*60}"
-        except:
-            pass
+        # Parse "25m+10s" format, spaces are ignored
+        match = _TIME_CONTROL_RE.fullmatch(timecontrol_str.replace(' ', ''))
+        if match:
+            return f"{int(match[1]) * 60}+{int(match[2])}"
         
         # If already in correct format (e.g., "1500+10"), return directly
         if '+' in timecontrol_str and timecontrol_str.replace('+', '').isdigit():
@@ -194,9 +253,61 @@ class PGNGenerator:
         
         return "2500+10"  # Default value
 
+    def build_header_templates(self, round_number: int, tournament_info: Dict[str, Any],
+                               round_data: Dict[str, Any]) -> Dict[Tuple[bool, bool], str]:
+        """
+        Build PGN header templates for a round
+        
+        Tournament and round level tags are filled in once, only the white, black,
+        result and FIDE ID fields are left as str.format_map placeholders.
+        
+        Args:
+            round_number: Round number
+            tournament_info: Tournament information
+            round_data: Round data
+            
+        Returns:
+            Templates keyed by (has white FIDE ID, has black FIDE ID)
+        """
+        def tag(name: str, value: Any) -> str:
+            # Braces in fixed values must not be read as placeholders
+            value = str(value).replace('{', '{{').replace('}', '}}')
+            return f'[{name} "{value}"]'
+        
+        date = round_data.get("date", "????.??.??")
+        timecontrol = self.format_time_control(tournament_info.get("timecontrol", "Unknown"))
+        head = [
+            tag("Event", tournament_info.get("name", "Unknown Tournament")),
+            tag("Site", f'{tournament_info.get("location", "Unknown")}, {tournament_info.get("country", "")}'),
+            tag("Date", date),
+            tag("Round", round_number),
+            '[White "{white}"]',
+            '[Black "{black}"]',
+            '[Result "{result}"]',
+            tag("TimeControl", timecontrol),
+        ]
+        tail = [
+            tag("EventDate", date),
+            '[EventType "tournament"]',
+            '[Source "LiveChessCloud"]',
+        ]
+        
+        templates = {}
+        for has_white in (False, True):
+            for has_black in (False, True):
+                fideids = []
+                if has_white:
+                    fideids.append('[WhiteFideId "{white_fideid}"]')
+                if has_black:
+                    fideids.append('[BlackFideId "{black_fideid}"]')
+                templates[has_white, has_black] = '\n'.join(head + fideids + tail)
+        return templates
+    
     def generate_game_pgn(self, round_number: int, game_number: int, 
                          tournament_info: Dict[str, Any], 
-                         round_data: Dict[str, Any]) -> Optional[str]:
+                         round_data: Dict[str, Any],
+                         header_templates: Optional[Dict[Tuple[bool, bool], str]] = None,
+                         game_data: Optional[Dict[str, Any]] = None) -> Optional[str]:
         """
         Generate PGN format for single game
         
@@ -205,12 +316,15 @@ class PGNGenerator:
             game_number: Game number
             tournament_info: Tournament information
             round_data: Round data
+            header_templates: Optional templates from build_header_templates
+            game_data: Optional preloaded game data, loaded when not given
             
         Returns:
             PGN format string, returns None on failure
         """
         # Get game data
-        game_data = self.load_game_data(round_number, game_number)
+        if game_data is None:
+            game_data = self.load_game_data(round_number, game_number)
         if not game_data:
             return None
         
@@ -232,53 +346,53 @@ class PGNGenerator:
         white_fideid = white.get('fideid', '')
         black_fideid = black.get('fideid', '')
         
-        # Format time control
-        timecontrol = self.format_time_control(tournament_info.get("timecontrol", "Unknown"))
-        
-        # Build PGN header information
-        pgn_headers = [
-            f'[Event "{tournament_info.get("name", "Unknown Tournament")}"]',
-            f'[Site "{tournament_info.get("location", "Unknown")}, {tournament_info.get("country", "")}"]',
-            f'[Date "{round_data.get("date", "????.??.??")}"]',
-            f'[Round "{round_number}"]',
-            f'[White "{white_name}"]',
-            f'[Black "{black_name}"]',
-            f'[Result "{result}"]',
-            f'[TimeControl "{timecontrol}"]',
-            f'[WhiteFideId "{white_fideid}"]' if white_fideid else '',
-            f'[BlackFideId "{black_fideid}"]' if black_fideid else '',
-            f'[EventDate "{round_data.get("date", "????.??.??")}"]',
-            f'[EventType "tournament"]',
-            f'[Source "LiveChessCloud"]'
-        ]
-        
-        # Filter empty strings
-        pgn_headers = [header for header in pgn_headers if header]
+        if header_templates is None:
+            header_templates = self.build_header_templates(round_number, tournament_info, round_data)
+        return self._render_game_pgn(header_templates, white_name, black_name, result,
+                                     white_fideid, black_fideid, game_data)
+    
+    def _render_game_pgn(self, header_templates: Dict[Tuple[bool, bool], str],
+                         white_name: str, black_name: str, result: str,
+                         white_fideid: Any, black_fideid: Any,
+                         game_data: Dict[str, Any]) -> str:
+        """Render one game from already extracted pairing fields"""
+        # Fill the per-game fields into the round's header template
+        template = header_templates[bool(white_fideid), bool(black_fideid)]
+        pgn_headers = template.format_map({
+            'white': white_name,
+            'black': black_name,
+            'result': result,
+            'white_fideid': white_fideid,
+            'black_fideid': black_fideid,
+        })
         
         # Get move sequence
         moves = game_data.get('moves', '')
         formatted_moves = self.format_moves_with_time(moves)
         
         # Combine PGN
-        pgn = '\n'.join(pgn_headers) + '\n\n' + formatted_moves + ' ' + result + '\n\n'
+        pgn = pgn_headers + '\n\n' + formatted_moves + ' ' + result + '\n\n'
         
         return pgn
     
-    def generate_round_pgn(self, round_number: int) -> Optional[str]:
+    def generate_round_pgn(self, round_number: int,
+                           tournament_info: Optional[Dict[str, Any]] = None) -> Optional[str]:
         """
         Generate PGN file for specified round
         
         Args:
             round_number: Round number
+            tournament_info: Tournament information, loaded when not given
             
         Returns:
             PGN content string, returns None on failure
         """
-        # Load tournament information
-        tournament_info = self.load_tournament_info()
-        if not tournament_info:
-            logger.error("Unable to load tournament information")
-            return None
+        # Load tournament information unless the caller already did
+        if tournament_info is None:
+            tournament_info = self.get_tournament_info()
+            if not tournament_info:
+                logger.error("Unable to load tournament information")
+                return None
         
         # Load round data
         round_data = self.load_round_data(round_number)
@@ -296,10 +410,27 @@ class PGNGenerator:
         
         logger.info(f"Generating round {round_number} PGN, {total_games} games total")
         
+        header_templates = self.build_header_templates(round_number, tournament_info, round_data)
+        round_games = self.load_round_games(round_number, total_games)
+        
+        # Extract the pairing fields into per-column lists once for the whole round
+        whites = [pairing.get('white', {}) for pairing in pairings]
+        blacks = [pairing.get('black', {}) for pairing in pairings]
+        white_names = [self.get_player_name(white) for white in whites]
+        black_names = [self.get_player_name(black) for black in blacks]
+        white_fideids = [white.get('fideid', '') for white in whites]
+        black_fideids = [black.get('fideid', '') for black in blacks]
+        results = [pairing.get('result', '*') for pairing in pairings]
+        
         # Generate PGN for each game
         pgn_content = []
-        for game_num in range(1, total_games + 1):
-            game_pgn = self.generate_game_pgn(round_number, game_num, tournament_info, round_data)
+        for index, game_data in enumerate(round_games):
+            game_num = index + 1
+            game_pgn = None
+            if game_data:
+                game_pgn = self._render_game_pgn(header_templates, white_names[index], black_names[index],
+                                                 results[index], white_fideids[index], black_fideids[index],
+                                                 game_data)
             if game_pgn:
                 pgn_content.append(game_pgn)
                 logger.info(f"  Game {game_num} PGN generated successfully")
@@ -308,10 +439,13 @@ class PGNGenerator:
         
         return '\n'.join(pgn_content)
     
-    def generate_tournament_pgn(self) -> bool:
+    def generate_tournament_pgn(self, max_workers: Optional[int] = None) -> bool:
         """
         Generate complete tournament PGN file
         
+        Args:
+            max_workers: Number of worker processes, defaults to the CPU count
+            
         Returns:
             Returns True on successful generation, False on failure
         """
@@ -321,7 +455,7 @@ class PGNGenerator:
         output_file = output_dir / "tournament.pgn"
         
         # Load tournament information
-        tournament_info = self.load_tournament_info()
+        tournament_info = self.get_tournament_info()
         if not tournament_info:
             logger.error("Unable to load tournament information")
             return False
@@ -332,34 +466,81 @@ class PGNGenerator:
         logger.info(f"Starting tournament PGN file generation: {tournament_name}")
         logger.info(f"Total rounds: {total_rounds}")
         
-        all_pgn_content = []
+        if not total_rounds:
+            logger.error("No successfully generated PGN content")
+            return False
+        
         success_count = 0
         
-        for round_num in range(1, total_rounds + 1):
-            logger.info(f"Processing round {round_num}/{total_rounds}")
-            
-            # Generate round PGN
-            pgn_content = self.generate_round_pgn(round_num)
-            if pgn_content:
-                all_pgn_content.append(pgn_content)
-                success_count += 1
-                logger.info(f"Round {round_num} PGN generated successfully")
-            else:
-                logger.warning(f"Round {round_num} PGN generation failed")
-        
-        if all_pgn_content:
-            try:
-                with open(output_file, 'w', encoding='utf-8') as f:
-                    f.write('\n'.join(all_pgn_content))
-                logger.info(f"Tournament PGN file saved: {output_file}")
-                logger.info(f"Contains {success_count}/{total_rounds} rounds of data")
-                return True
-            except Exception as e:
-                logger.error(f"Failed to save tournament PGN file: {e}")
-                return False
-        else:
+        # Stream rounds into a temporary file, the previous output is kept if nothing is generated
+        tmp_file = output_file.with_name(output_file.name + '.tmp')
+        # Scan the data directories once here, every worker reuses the same index
+        self._ensure_index()
+        # No more processes than rounds, all of them are started up front. The reader threads
+        # are split between the processes instead of giving each process all of them
+        processes = max(1, min(max_workers or os.cpu_count() or 1, total_rounds))
+        read_workers = max(1, self.read_workers // processes)
+        try:
+            with open(tmp_file, 'w', encoding='utf-8', buffering=1 << 20) as f, \
+                    ProcessPoolExecutor(max_workers=processes, initializer=_init_render_worker,
+                                        initargs=(self.data_dir, self._round_files, self._game_files,
+                                                  read_workers)) as executor:
+                # Rounds are independent, render them in worker processes (map keeps round order)
+                round_numbers = range(1, total_rounds + 1)
+                results = executor.map(_render_round, round_numbers, repeat(tournament_info))
+                for round_num, pgn_content in zip(round_numbers, results):
+                    logger.info(f"Processed round {round_num}/{total_rounds}")
+                    if pgn_content:
+                        if success_count:
+                            f.write('\n')
+                        f.write(pgn_content)
+                        success_count += 1
+                        logger.info(f"Round {round_num} PGN generated successfully")
+                    else:
+                        logger.warning(f"Round {round_num} PGN generation failed")
+            if success_count:
+                os.replace(tmp_file, output_file)
+        except OSError as e:
+            tmp_file.unlink(missing_ok=True)
+            logger.error(f"Failed to save tournament PGN file: {e}")
+            return False
+        except BaseException:
+            # Rendering errors and interrupts propagate, without leaving the temporary file behind
+            tmp_file.unlink(missing_ok=True)
+            raise
+        
+        if not success_count:
+            tmp_file.unlink(missing_ok=True)
             logger.error("No successfully generated PGN content")
             return False
+        
+        logger.info(f"Tournament PGN file saved: {output_file}")
+        logger.info(f"Contains {success_count}/{total_rounds} rounds of data")
+        return True
+
+
+@functools.lru_cache(maxsize=16384)
+def _clock_tag(time_str: str) -> str:
+    """Memoized format_time_chessbase, raw clock strings repeat across the games of a round"""
+    return PGNGenerator.format_time_chessbase(time_str)
+
+
+# Generator of the current worker process, created by _init_render_worker
+_worker_generator: Optional[PGNGenerator] = None
+
+
+def _init_render_worker(data_dir: Path, round_files: frozenset, game_files: frozenset, read_workers: int):
+    """Create the worker's generator once, reusing the file name index scanned by the parent"""
+    global _worker_generator
+    _worker_generator = PGNGenerator(data_dir)
+    _worker_generator.read_workers = read_workers
+    _worker_generator._round_files = round_files
+    _worker_generator._game_files = game_files
+
+
+def _render_round(round_number: int, tournament_info: Dict[str, Any]) -> Optional[str]:
+    """Render one round in a worker process"""
+    return _worker_generator.generate_round_pgn(round_number, tournament_info)
 
 
 def main():
@@ -18,19 +18,39 @@ Date: 2024
 import os
 import json
 import time
+import threading
 import requests
+from requests.adapters import HTTPAdapter
+from concurrent.futures import FIRST_COMPLETED, Executor, Future, ThreadPoolExecutor, wait
 from typing import Dict, List, Optional, Any
 from pathlib import Path
 import logging
+import logging.handlers
 from urllib.parse import urljoin
 import sys
 
+from config import REQUEST_CONFIG
+
+# Prefer orjson for faster decoding and encoding, fall back to the standard library
+try:
+    import orjson
+    from orjson import loads as json_loads
+except ImportError:
+    orjson = None
+    from json import loads as json_loads
+
 # Configure logging
+LOG_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+
+# Batch file writes, records are flushed every 512 entries, on errors and at exit
+_file_handler = logging.FileHandler('scraper.log')
+_file_handler.setFormatter(logging.Formatter(LOG_FORMAT))
+
 logging.basicConfig(
     level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
+    format=LOG_FORMAT,
     handlers=[
-        logging.FileHandler('scraper.log'),
+        logging.handlers.MemoryHandler(capacity=512, target=_file_handler),
         logging.StreamHandler()
     ]
 )
@@ -63,6 +83,11 @@ class LiveChessCloudScraper:
             'Connection': 'keep-alive',
         })
         
+        # Enlarge the connection pool so worker threads don't serialize on it
+        adapter = HTTPAdapter(pool_connections=32, pool_maxsize=32)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        
         # Create data storage directories
         self.data_dir = Path("data/raw_data")
         self.tournament_dir = self.data_dir / "tournament"
@@ -71,9 +96,23 @@ class LiveChessCloudScraper:
         
         self._create_directories()
         
-        # Request configuration
-        self.request_delay = 1.0  # Request interval (seconds)
-        self.max_retries = 3      # Maximum retry attempts
+        # Request configuration, see REQUEST_CONFIG in config.py
+        self.max_workers = REQUEST_CONFIG['max_workers']    # Concurrent game downloads
+        self.rate_limit = REQUEST_CONFIG['rate_limit']      # Maximum requests per second
+        self.rate_burst = REQUEST_CONFIG['rate_burst']      # Requests allowed in a burst
+        self.max_retries = REQUEST_CONFIG['max_retries']    # Maximum retry attempts
+        
+        # Token bucket state shared by worker threads
+        self._rate_lock = threading.Lock()
+        self._tokens = float(self.rate_burst)
+        self._last_refill = time.monotonic()
+        
+        # Set when scraping is interrupted, wakes threads waiting for a token or a retry
+        self._stopping = threading.Event()
+        
+        # Cap on game saves queued in the background, bounds memory held by pending data
+        self.max_pending_writes = 64
+        self._pending_writes = threading.BoundedSemaphore(self.max_pending_writes)
         
     def _create_directories(self):
         """Create data storage directory structure"""
@@ -81,6 +120,19 @@ class LiveChessCloudScraper:
             directory.mkdir(parents=True, exist_ok=True)
             logger.info(f"Created directory: {directory}")
     
+    def _wait_for_token(self):
+        """Block until the token bucket allows another request"""
+        with self._rate_lock:
+            now = time.monotonic()
+            self._tokens = min(self.rate_burst,
+                               self._tokens + (now - self._last_refill) * self.rate_limit)
+            self._last_refill = now
+            # Take a token; a negative balance is the time this caller must wait
+            self._tokens -= 1
+            wait_time = -self._tokens / self.rate_limit if self._tokens < 0 else 0.0
+        if wait_time > 0:
+            self._stopping.wait(wait_time)
+    
     def _make_request(self, url: str, retries: int = None) -> Optional[Dict[str, Any]]:
         """
         Send HTTP request and handle exceptions
@@ -97,38 +149,40 @@ class LiveChessCloudScraper:
             
         for attempt in range(retries + 1):
             try:
-                logger.info(f"Requesting URL: {url} (attempt {attempt + 1}/{retries + 1})")
+                logger.debug("Requesting URL: %s (attempt %d/%d)", url, attempt + 1, retries + 1)
                 
+                # Rate limiting to avoid being blocked
+                self._wait_for_token()
+                if self._stopping.is_set():
+                    return None
                 response = self.session.get(url, timeout=30)
                 response.raise_for_status()
                 
                 # Check response content
                 if not response.content:
-                    logger.warning(f"Empty response: {url}")
+                    logger.warning("Empty response: %s", url)
                     return None
                     
-                data = response.json()
-                logger.info(f"Successfully retrieved data: {url}")
-                
-                # Request interval to avoid rate limiting
-                time.sleep(self.request_delay)
+                # Decode the raw body directly, skipping requests' text decoding and charset detection
+                data = json_loads(response.content)
+                logger.debug("Successfully retrieved data: %s", url)
                 return data
                 
             except requests.exceptions.RequestException as e:
-                logger.error(f"Request failed (attempt {attempt + 1}): {url} - {e}")
+                logger.error("Request failed (attempt %d): %s - %s", attempt + 1, url, e)
                 if attempt < retries:
                     wait_time = (attempt + 1) * 2  # Incremental wait time
-                    logger.info(f"Waiting {wait_time} seconds before retry...")
-                    time.sleep(wait_time)
+                    logger.info("Waiting %d seconds before retry...", wait_time)
+                    self._stopping.wait(wait_time)
                 else:
-                    logger.error(f"Reached maximum retry attempts, abandoning request: {url}")
+                    logger.error("Reached maximum retry attempts, abandoning request: %s", url)
                     return None
                     
             except json.JSONDecodeError as e:
-                logger.error(f"JSON parsing failed: {url} - {e}")
+                logger.error("JSON parsing failed: %s - %s", url, e)
                 return None
             except Exception as e:
-                logger.error(f"Unknown error: {url} - {e}")
+                logger.error("Unknown error: %s - %s", url, e)
                 return None
     
     def _save_json(self, data: Dict[str, Any], filepath: Path) -> bool:
@@ -143,14 +197,28 @@ class LiveChessCloudScraper:
             Returns True on successful save, False on failure
         """
         try:
-            with open(filepath, 'w', encoding='utf-8') as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
-            logger.info(f"Data saved: {filepath}")
+            if orjson is not None:
+                filepath.write_bytes(orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS))
+            else:
+                with open(filepath, 'w', encoding='utf-8') as f:
+                    json.dump(data, f, ensure_ascii=False, indent=2)
+            logger.debug("Data saved: %s", filepath)
             return True
         except Exception as e:
-            logger.error(f"Failed to save file: {filepath} - {e}")
+            logger.error("Failed to save file: %s - %s", filepath, e)
             return False
     
+    def _save_json_later(self, data: Dict[str, Any], filepath: Path, writer: Executor) -> Future:
+        """
+        Queue a JSON save on the writer pool
+        
+        Blocks while max_pending_writes saves are still outstanding.
+        """
+        self._pending_writes.acquire()
+        future = writer.submit(self._save_json, data, filepath)
+        future.add_done_callback(lambda _: self._pending_writes.release())
+        return future
+    
     def fetch_tournament_info(self) -> Optional[Dict[str, Any]]:
         """
         Get tournament metadata
@@ -199,16 +267,23 @@ class LiveChessCloudScraper:
         Returns:
             Game detailed info, returns None on failure
         """
-        url = f"{self.base_url}/get/{self.match_id}/round-{round_number}/game-{game_number}.json?poll"
-        data = self._make_request(url)
+        data = self._request_game_detail(round_number, game_number)
         
         if data:
-            filepath = self.games_dir / f"round_{round_number}_game_{game_number}.json"
-            if self._save_json(data, filepath):
+            if self._save_json(data, self._game_path(round_number, game_number)):
                 return data
         
         return None
     
+    def _request_game_detail(self, round_number: int, game_number: int) -> Optional[Dict[str, Any]]:
+        """Request game detail without saving it"""
+        url = f"{self.base_url}/get/{self.match_id}/round-{round_number}/game-{game_number}.json?poll"
+        return self._make_request(url)
+    
+    def _game_path(self, round_number: int, game_number: int) -> Path:
+        """Path of the saved game detail file"""
+        return self.games_dir / f"round_{round_number}_game_{game_number}.json"
+    
     def scrape_tournament(self) -> bool:
         """
         Main method to scrape complete tournament data
@@ -231,40 +306,101 @@ class LiveChessCloudScraper:
         logger.info(f"Tournament has {total_rounds} rounds")
         
         # 3. Iterate through each round to get pairing tables and game details
-        for round_num in range(1, total_rounds + 1):
-            logger.info(f"Step 2.{round_num}: Processing round {round_num}")
-            print(f"\n\033[1;36m[Round Progress] Round {round_num}/{total_rounds}\033[0m", flush=True)
-            
-            # Get round pairing table
-            round_index = self.fetch_round_index(round_num)
-            if not round_index:
-                logger.warning(f"Unable to get round {round_num} pairing table, skipping")
-                continue
-            
-            # Get all games in this round
-            pairings = round_index.get('pairings', [])
-            total_games = len(pairings)
-            logger.info(f"Round {round_num} has {total_games} games")
-            
-            # Progress bar initialization
-            bar_width = 40
-            for game_num in range(1, total_games + 1):
-                # Print progress bar
-                progress = game_num / total_games
-                filled_len = int(bar_width * progress)
-                bar = '█' * filled_len + '-' * (bar_width - filled_len)
-                sys.stdout.write(f"\r  [Game Progress] Game {game_num}/{total_games} |{bar}| {progress*100:5.1f}%")
-                sys.stdout.flush()
+        # Background game saves and their (round, game), checked once the writer pool has drained
+        saves = {}
+        self._stopping.clear()
+        
+        # The writer pool is exited last so it drains every queued save
+        with ThreadPoolExecutor(max_workers=4) as writer, \
+                ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            # Requests in flight, kept outside the loop for the interrupt path:
+            # pairing tables by round number and games with their game number
+            round_futures = {}
+            pending = {}
+            try:
+                if total_rounds:
+                    round_futures[1] = executor.submit(self.fetch_round_index, 1)
                 
-                game_detail = self.fetch_game_detail(round_num, game_num)
-                if not game_detail:
-                    logger.warning(f"Unable to get round {round_num} game {game_num} details")
-                # Optional: display game status
-                # else:
-                #     status = game_detail.get('status', 'unknown')
-                #     sys.stdout.write(f" Status:{status}")
-            sys.stdout.write("\n")
-            sys.stdout.flush()
+                for round_num in range(1, total_rounds + 1):
+                    # Request the next pairing table while this round's games download,
+                    # instead of one blocking round trip per round
+                    if round_num < total_rounds:
+                        round_futures[round_num + 1] = executor.submit(self.fetch_round_index, round_num + 1)
+                    
+                    logger.info(f"Step 2.{round_num}: Processing round {round_num}")
+                    print(f"\n\033[1;36m[Round Progress] Round {round_num}/{total_rounds}\033[0m", flush=True)
+                    
+                    # Get round pairing table
+                    round_index = round_futures.pop(round_num).result()
+                    if not round_index:
+                        logger.warning(f"Unable to get round {round_num} pairing table, skipping")
+                        continue
+                    
+                    # Get all games in this round
+                    pairings = round_index.get('pairings', [])
+                    total_games = len(pairings)
+                    logger.info(f"Round {round_num} has {total_games} games")
+                    
+                    # Fetch games concurrently, the token bucket keeps the request rate polite.
+                    # Only a bounded window is queued at a time so an interrupt has little to cancel
+                    window = self.max_workers * 2
+                    next_game = 1
+                    completed = 0
+                    
+                    # Progress bar initialization
+                    bar_width = 40
+                    last_paint = 0.0
+                    while pending or next_game <= total_games:
+                        while next_game <= total_games and len(pending) < window:
+                            pending[executor.submit(self._request_game_detail, round_num, next_game)] = next_game
+                            next_game += 1
+                        
+                        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                        for future in done:
+                            completed += 1
+                            # Print progress bar, repainting at most every 100ms (always on the last game)
+                            now = time.monotonic()
+                            if now - last_paint > 0.1 or completed == total_games:
+                                progress = completed / total_games
+                                filled_len = int(bar_width * progress)
+                                bar = '█' * filled_len + '-' * (bar_width - filled_len)
+                                sys.stdout.write(f"\r  [Game Progress] Game {completed}/{total_games} |{bar}| {progress*100:5.1f}%")
+                                sys.stdout.flush()
+                                last_paint = now
+                            
+                            game_num = pending.pop(future)
+                            game_detail = future.result()
+                            if not game_detail:
+                                logger.warning(f"Unable to get round {round_num} game {game_num} details")
+                            else:
+                                # Save in the background so the next fetch isn't held up by disk I/O
+                                save = self._save_json_later(game_detail, self._game_path(round_num, game_num), writer)
+                                saves[save] = (round_num, game_num)
+                            # Optional: display game status
+                            # else:
+                            #     status = game_detail.get('status', 'unknown')
+                            #     sys.stdout.write(f" Status:{status}")
+                    sys.stdout.write("\n")
+                    sys.stdout.flush()
+            except BaseException:
+                # Drop queued requests instead of letting the executor finish them on exit,
+                # and keep the games that were already downloaded
+                self._stopping.set()
+                for future in round_futures.values():
+                    future.cancel()
+                executor.shutdown(wait=False, cancel_futures=True)
+                for future, game_num in pending.items():
+                    if future.done() and not future.cancelled() and future.exception() is None:
+                        game_detail = future.result()
+                        if game_detail:
+                            self._save_json_later(game_detail, self._game_path(round_num, game_num), writer)
+                raise
+        
+        failed_saves = sorted(key for save, key in saves.items() if not save.result())
+        for round_num, game_num in failed_saves:
+            logger.warning(f"Unable to save round {round_num} game {game_num} details")
+        if failed_saves:
+            logger.warning(f"{len(failed_saves)}/{len(saves)} game files could not be saved")
         
         logger.info("Tournament data scraping completed!")
         print("\n\033[1;32mAll scraping completed!\033[0m")
@@ -7,14 +7,46 @@ LiveChessCloud Scraper Utilities
 Utility function collection containing data analysis, PGN conversion, and other functionality.
 """
 
-import json
+import os
 import re
+import sys
+import json
+import hashlib
+import mmap
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Dict, List, Optional, Any, Tuple
+from typing import Dict, Iterator, List, Optional, Any, Tuple
 import logging
 
+# Prefer orjson for faster decoding, fall back to the standard library
+try:
+    from orjson import loads as json_loads
+    _LOADS_ACCEPTS_BUFFER = True
+except ImportError:
+    from json import loads as json_loads
+    _LOADS_ACCEPTS_BUFFER = False
+
 logger = logging.getLogger(__name__)
 
+# Player statistics cache file name, stored in the analyzer's data directory
+_PLAYER_STATS_CACHE = ".player_stats.json"
+
+# Threads reading round files ahead of player statistics aggregation
+_ROUND_READ_WORKERS = 4
+
+# Files at least this large are parsed from a memory map instead of a bytes copy
+_MMAP_MIN_SIZE = 1 << 20
+
+
+def _read_json(path: str) -> Any:
+    """Parse a JSON file, large files are memory mapped so the OS pages them in on demand"""
+    with open(path, 'rb') as f:
+        if _LOADS_ACCEPTS_BUFFER and os.fstat(f.fileno()).st_size >= _MMAP_MIN_SIZE:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm, memoryview(mm) as view:
+                return json_loads(view)
+        return json_loads(f.read())
+
 
 class ChessDataAnalyzer:
     """Chess data analyzer"""
@@ -30,40 +62,87 @@ class ChessDataAnalyzer:
         self.tournament_dir = self.data_dir / "tournament"
         self.rounds_dir = self.data_dir / "rounds"
         self.games_dir = self.data_dir / "games"
+        
+        # Plain string prefixes for building file paths in per-file loads
+        self._rounds_base = str(self.rounds_dir) + os.sep
+        self._games_base = str(self.games_dir) + os.sep
+        
+        # Successfully loaded tournament and round data, see clear_cache
+        self._tournament_info: Optional[Dict[str, Any]] = None
+        self._round_cache: Dict[int, Dict[str, Any]] = {}
+    
+    def clear_cache(self):
+        """Forget loaded tournament and round data, needed if files change after the first load"""
+        self._tournament_info = None
+        self._round_cache = {}
     
     def load_tournament_info(self) -> Optional[Dict[str, Any]]:
-        """Load tournament information"""
+        """Load tournament information (cached)"""
+        if self._tournament_info is not None:
+            return self._tournament_info
         try:
-            info_file = self.tournament_dir / "info.json"
-            if info_file.exists():
-                with open(info_file, 'r', encoding='utf-8') as f:
-                    return json.load(f)
+            self._tournament_info = _read_json(str(self.tournament_dir / "info.json"))
+        except FileNotFoundError:
+            pass
         except Exception as e:
             logger.error(f"Failed to load tournament info: {e}")
-        return None
+        return self._tournament_info
     
     def load_round_data(self, round_number: int) -> Optional[Dict[str, Any]]:
-        """Load specified round data"""
+        """Load specified round data (cached)"""
+        round_data = self._round_cache.get(round_number)
+        if round_data is not None:
+            return round_data
         try:
-            round_file = self.rounds_dir / f"round_{round_number}_index.json"
-            if round_file.exists():
-                with open(round_file, 'r', encoding='utf-8') as f:
-                    return json.load(f)
+            round_data = _read_json(f"{self._rounds_base}round_{round_number}_index.json")
+        except FileNotFoundError:
+            return None
         except Exception as e:
             logger.error(f"Failed to load round {round_number} data: {e}")
-        return None
+            return None
+        if round_data is not None:
+            self._round_cache[round_number] = round_data
+        return round_data
     
     def load_game_data(self, round_number: int, game_number: int) -> Optional[Dict[str, Any]]:
         """Load specified game data"""
         try:
-            game_file = self.games_dir / f"round_{round_number}_game_{game_number}.json"
-            if game_file.exists():
-                with open(game_file, 'r', encoding='utf-8') as f:
-                    return json.load(f)
+            return _read_json(f"{self._games_base}round_{round_number}_game_{game_number}.json")
+        except FileNotFoundError:
+            pass
         except Exception as e:
             logger.error(f"Failed to load round {round_number} game {game_number} data: {e}")
         return None
     
+    def iter_round_files(self) -> Iterator[Tuple[int, Path]]:
+        """
+        Iterate over the round index files present on disk
+        
+        Yields:
+            (round number, file path) pairs sorted by round number
+        """
+        rounds = []
+        try:
+            with os.scandir(self.rounds_dir) as entries:
+                for entry in entries:
+                    name = entry.name
+                    number = name[6:-11]
+                    # Only canonical names as written by the scraper, e.g. round_12_index.json
+                    if (name.startswith('round_') and name.endswith('_index.json')
+                            and number.isdecimal() and number[0] != '0'):
+                        rounds.append((int(number), Path(entry.path)))
+        except FileNotFoundError:
+            return
+        yield from sorted(rounds)
+    
+    def iter_round_numbers(self, total_rounds: int) -> Iterator[int]:
+        """Iterate over the rounds 1..total_rounds whose index file exists"""
+        for round_number, _ in self.iter_round_files():
+            if round_number > total_rounds:
+                break
+            if round_number >= 1:
+                yield round_number
+    
     def get_tournament_summary(self) -> Dict[str, Any]:
         """Get tournament summary information"""
         tournament_info = self.load_tournament_info()
@@ -84,77 +163,137 @@ class ChessDataAnalyzer:
             round_data = self.load_round_data(i)
             if round_data:
                 pairings = round_data.get('pairings', [])
+                finished = live = 0
+                for p in pairings:
+                    if p.get('result'):
+                        finished += 1
+                    if p.get('live'):
+                        live += 1
                 summary['rounds_info'].append({
                     'round': i,
                     'date': round_data.get('date', 'Unknown'),
                     'total_games': len(pairings),
-                    'finished_games': len([p for p in pairings if p.get('result')]),
-                    'live_games': len([p for p in pairings if p.get('live')])
+                    'finished_games': finished,
+                    'live_games': live
                 })
         
         return summary
     
     def get_player_statistics(self) -> Dict[str, Dict[str, Any]]:
-        """Get player statistics"""
-        players = {}
-        tournament_info = self.load_tournament_info()
+        """
+        Get player statistics
         
-        if not tournament_info:
+        Results are cached in data_dir/.player_stats.json and reused until
+        the tournament info or a round file changes.
+        """
+        cache_key = self._player_stats_cache_key()
+        players = self._load_player_stats_cache(cache_key)
+        if players is not None:
             return players
         
-        total_rounds = len(tournament_info.get('rounds', []))
+        # The files changed since the cache was written, so data memoized by
+        # this analyzer may be stale as well
+        self.clear_cache()
+        tournament_info = self.load_tournament_info()
+        if not tournament_info:
+            return {}
         
-        for round_num in range(1, total_rounds + 1):
-            round_data = self.load_round_data(round_num)
-            if not round_data:
+        players = self._compute_player_statistics(tournament_info)
+        # Only save if nothing changed while reading, otherwise the key would not match the data
+        if self._player_stats_cache_key() == cache_key:
+            self._save_player_stats_cache(cache_key, players)
+        return players
+    
+    def _player_stats_cache_key(self) -> str:
+        """Fingerprint the files player statistics are computed from"""
+        sources = [self.tournament_dir / "info.json"]
+        sources.extend(path for _, path in self.iter_round_files())
+        fingerprint = []
+        for path in sources:
+            try:
+                st = path.stat()
+            except OSError:
                 continue
-            
-            for pairing in round_data.get('pairings', []):
-                # Process white player
-                white = pairing.get('white', {})
-                white_name = white.get('lname', 'Unknown')
-                if white_name not in players:
-                    players[white_name] = {
-                        'fideid': white.get('fideid'),
-                        'games_as_white': 0,
-                        'games_as_black': 0,
-                        'wins': 0,
-                        'losses': 0,
-                        'draws': 0,
-                        'total_games': 0
-                    }
-                
-                players[white_name]['games_as_white'] += 1
-                players[white_name]['total_games'] += 1
-                
-                # Process black player
-                black = pairing.get('black', {})
-                black_name = black.get('lname', 'Unknown')
-                if black_name not in players:
-                    players[black_name] = {
-                        'fideid': black.get('fideid'),
-                        'games_as_white': 0,
-                        'games_as_black': 0,
-                        'wins': 0,
-                        'losses': 0,
-                        'draws': 0,
-                        'total_games': 0
-                    }
-                
-                players[black_name]['games_as_black'] += 1
-                players[black_name]['total_games'] += 1
+            fingerprint.append((path.name, st.st_mtime_ns, st.st_size))
+        return hashlib.md5(repr(fingerprint).encode('utf-8')).hexdigest()
+    
+    def _load_player_stats_cache(self, cache_key: str) -> Optional[Dict[str, Dict[str, Any]]]:
+        """Load cached player statistics, returns None when missing or stale"""
+        try:
+            cache = _read_json(str(self.data_dir / _PLAYER_STATS_CACHE))
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable player statistics cache: {e}")
+            return None
+        if not isinstance(cache, dict) or cache.get('key') != cache_key:
+            return None
+        players = cache.get('players')
+        return players if isinstance(players, dict) else None
+    
+    def _save_player_stats_cache(self, cache_key: str, players: Dict[str, Dict[str, Any]]):
+        """Save player statistics next to the data they were computed from"""
+        # JSON object keys are always strings, other names would not round-trip
+        if not all(isinstance(name, str) for name in players):
+            return
+        cache_file = self.data_dir / _PLAYER_STATS_CACHE
+        tmp_file = cache_file.with_name(cache_file.name + '.tmp')
+        try:
+            tmp_file.write_text(json.dumps({'key': cache_key, 'players': players}, ensure_ascii=False),
+                                encoding='utf-8')
+            os.replace(tmp_file, cache_file)
+        except (OSError, TypeError, ValueError) as e:
+            logger.warning(f"Failed to save player statistics cache: {e}")
+    
+    def _compute_player_statistics(self, tournament_info: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+        """Aggregate player statistics from the round files"""
+        players = {}
+        total_rounds = len(tournament_info.get('rounds', []))
+        rows = []
+        fideids = {}  # First seen FIDE ID per player, in order of first appearance
+        
+        # Read rounds in the background while earlier ones are aggregated,
+        # consuming the futures in round order
+        with ThreadPoolExecutor(max_workers=_ROUND_READ_WORKERS) as executor:
+            futures = [executor.submit(self.load_round_data, round_num)
+                       for round_num in self.iter_round_numbers(total_rounds)]
+            for future in futures:
+                round_data = future.result()
+                if not round_data:
+                    continue
                 
-                # Statistics for results
-                result = pairing.get('result', '')
-                if result == '1-0':
-                    players[white_name]['wins'] += 1
-                    players[black_name]['losses'] += 1
-                elif result == '0-1':
-                    players[black_name]['wins'] += 1
-                    players[white_name]['losses'] += 1
-                elif result == '1/2-1/2':
-                    players[white_name]['draws'] += 1
-                    players[black_name]['draws'] += 1
+                # Flatten pairings into (white, black, result) rows
+                for pairing in round_data.get('pairings', []):
+                    white = pairing.get('white', {})
+                    black = pairing.get('black', {})
+                    white_name = white.get('lname', 'Unknown')
+                    black_name = black.get('lname', 'Unknown')
+                    fideids.setdefault(white_name, white.get('fideid'))
+                    fideids.setdefault(black_name, black.get('fideid'))
+                    rows.append((white_name, black_name, pairing.get('result', '')))
+        
+        if not rows:
+            return players
+        
+        # Aggregate with C-level counters instead of branching per pairing
+        whites, blacks, results = zip(*rows)
+        as_white = Counter(whites)
+        as_black = Counter(blacks)
+        white_results = Counter(zip(whites, results))
+        black_results = Counter(zip(blacks, results))
+        
+        for name, fideid in fideids.items():
+            games_as_white = as_white[name]
+            games_as_black = as_black[name]
+            players[name] = {
+                'fideid': fideid,
+                'games_as_white': games_as_white,
+                'games_as_black': games_as_black,
+                'wins': white_results[name, '1-0'] + black_results[name, '0-1'],
+                'losses': white_results[name, '0-1'] + black_results[name, '1-0'],
+                'draws': white_results[name, '1/2-1/2'] + black_results[name, '1/2-1/2'],
+                'total_games': games_as_white + games_as_black
+            }
         
         return players
 
@@ -171,20 +310,41 @@ class PGNConverter:
         """
         self.data_dir = Path(data_dir)
         self.analyzer = ChessDataAnalyzer(data_dir)
+        
+        # Tournament level header values, identical for every game
+        info = self.analyzer.load_tournament_info() or {}
+        location = info.get('location', 'Unknown')
+        country = info.get('country', '')
+        self._event = info.get('name', 'Unknown Tournament')
+        self._site = f"{location}, {country}" if country else location
+        self._tc = info.get('timecontrol', 'Unknown')
+        self._time_control_tag = f'[TimeControl "{self._tc}"]\n'
+    
+    def _build_round_header_prefix(self, round_number: int, date: str) -> str:
+        """Build the Event, Site, Date and Round tags shared by every game of a round"""
+        return ''.join([
+            f'[Event "{self._event}"]\n',
+            f'[Site "{self._site}"]\n',
+            f'[Date "{date}"]\n',
+            f'[Round "{round_number}"]\n'
+        ])
     
-    def convert_game_to_pgn(self, round_number: int, game_number: int) -> Optional[str]:
+    def convert_game_to_pgn(self, round_number: int, game_number: int,
+                            round_data: Optional[Dict[str, Any]] = None) -> Optional[str]:
         """
         Convert single game to PGN format
         
         Args:
             round_number: Round number
             game_number: Game number
+            round_data: Optional preloaded round data, loaded when not given
             
         Returns:
             PGN format string, returns None on failure
         """
         game_data = self.analyzer.load_game_data(round_number, game_number)
-        round_data = self.analyzer.load_round_data(round_number)
+        if round_data is None:
+            round_data = self.analyzer.load_round_data(round_number)
         
         if not game_data or not round_data:
             return None
@@ -194,32 +354,53 @@ class PGNConverter:
         if game_number > len(pairings):
             return None
         
-        pairing = pairings[game_number - 1]
+        header_prefix = self._build_round_header_prefix(round_number, round_data.get("date", "????.??.??"))
+        return self._convert_game_from_context(header_prefix, pairings[game_number - 1], game_data)
+    
+    def _convert_game_from_context(self, header_prefix: str, pairing: Dict[str, Any],
+                                   game_data: Dict[str, Any]) -> str:
+        """
+        Convert single game to PGN format from already loaded data
+        
+        Args:
+            header_prefix: Round level tags from _build_round_header_prefix
+            pairing: Pairing of the game within the round
+            game_data: Game data
+            
+        Returns:
+            PGN format string
+        """
         white = pairing.get('white', {})
         black = pairing.get('black', {})
         result = pairing.get('result', '*')
         
-        # Build PGN header
-        pgn_headers = [
-            f'[Event "{self._get_tournament_name()}"]',
-            f'[Site "{self._get_tournament_location()}"]',
-            f'[Date "{round_data.get("date", "????.??.??")}"]',
-            f'[Round "{round_number}"]',
-            f'[White "{white.get("lname", "Unknown")}"]',
-            f'[Black "{black.get("lname", "Unknown")}"]',
-            f'[Result "{result}"]',
-            f'[TimeControl "{self._get_time_control()}"]',
-            f'[FEN "{game_data.get("initialFen", "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1")}"]'
-        ]
+        # Build PGN header, round level tags are shared by the whole round
+        fen = game_data.get("initialFen", "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1")
         
         # Get move sequence
         moves = game_data.get('moves', '')
         
         # Combine PGN
-        pgn = '\n'.join(pgn_headers) + '\n\n' + moves + ' ' + result + '\n\n'
+        pgn = ''.join([
+            header_prefix,
+            f'[White "{white.get("lname", "Unknown")}"]\n',
+            f'[Black "{black.get("lname", "Unknown")}"]\n',
+            f'[Result "{result}"]\n',
+            self._time_control_tag,
+            f'[FEN "{fen}"]\n\n',
+            moves, ' ', result, '\n\n'
+        ])
         
         return pgn
     
+    def _convert_task(self, task: Tuple[int, int, str, Dict[str, Any]]) -> Optional[str]:
+        """Load one game and convert it, run by the convert_tournament_to_pgn workers"""
+        round_number, game_number, header_prefix, pairing = task
+        game_data = self.analyzer.load_game_data(round_number, game_number)
+        if not game_data:
+            return None
+        return self._convert_game_from_context(header_prefix, pairing, game_data)
+    
     def convert_tournament_to_pgn(self, output_file: str = "tournament.pgn") -> bool:
         """
         Convert entire tournament to PGN file
@@ -237,24 +418,40 @@ class PGNConverter:
                 return False
             
             total_rounds = len(tournament_info.get('rounds', []))
-            pgn_content = []
             
-            for round_num in range(1, total_rounds + 1):
+            # Flatten the tournament into (round, game, round header prefix, pairing) tasks,
+            # the round level tags are built once per round
+            tasks = []
+            for round_num in self.analyzer.iter_round_numbers(total_rounds):
                 round_data = self.analyzer.load_round_data(round_num)
                 if not round_data:
                     continue
                 
-                total_games = len(round_data.get('pairings', []))
-                
-                for game_num in range(1, total_games + 1):
-                    game_pgn = self.convert_game_to_pgn(round_num, game_num)
-                    if game_pgn:
-                        pgn_content.append(game_pgn)
-                        logger.info(f"Converted round {round_num} game {game_num} to PGN")
+                header_prefix = self._build_round_header_prefix(round_num, round_data.get("date", "????.??.??"))
+                tasks.extend((round_num, game_num, header_prefix, pairing)
+                             for game_num, pairing in enumerate(round_data.get('pairings', []), 1))
             
-            # Save PGN file
-            with open(output_file, 'w', encoding='utf-8') as f:
-                f.write('\n'.join(pgn_content))
+            # Games are independent and I/O bound, convert them on a thread pool (map keeps task order)
+            # and stream each game to a temporary file as soon as it is next in line, so a failed
+            # conversion leaves the previous output untouched
+            max_workers = (os.cpu_count() or 1) * 2
+            tmp_file = f"{output_file}.tmp"
+            try:
+                with open(tmp_file, 'w', encoding='utf-8', buffering=1 << 20) as f, \
+                        ThreadPoolExecutor(max_workers=max_workers) as executor:
+                    results = executor.map(self._convert_task, tasks)
+                    written = 0
+                    for (round_num, game_num, _, _), game_pgn in zip(tasks, results):
+                        if game_pgn:
+                            if written:
+                                f.write('\n')
+                            f.write(game_pgn)
+                            written += 1
+                            logger.info(f"Converted round {round_num} game {game_num} to PGN")
+                os.replace(tmp_file, output_file)
+            except BaseException:
+                Path(tmp_file).unlink(missing_ok=True)
+                raise
             
             logger.info(f"PGN file saved: {output_file}")
             return True
@@ -262,25 +459,6 @@ class PGNConverter:
         except Exception as e:
             logger.error(f"PGN conversion failed: {e}")
             return False
-    
-    def _get_tournament_name(self) -> str:
-        """Get tournament name"""
-        tournament_info = self.analyzer.load_tournament_info()
-        return tournament_info.get('name', 'Unknown Tournament') if tournament_info else 'Unknown Tournament'
-    
-    def _get_tournament_location(self) -> str:
-        """Get tournament location"""
-        tournament_info = self.analyzer.load_tournament_info()
-        if tournament_info:
-            location = tournament_info.get('location', 'Unknown')
-            country = tournament_info.get('country', '')
-            return f"{location}, {country}" if country else location
-        return 'Unknown'
-    
-    def _get_time_control(self) -> str:
-        """Get time control"""
-        tournament_info = self.analyzer.load_tournament_info()
-        return tournament_info.get('timecontrol', 'Unknown') if tournament_info else 'Unknown'
 
 
 def print_tournament_summary():
@@ -292,18 +470,24 @@ def print_tournament_summary():
         print("Unable to get tournament summary information")
         return
     
-    print("=" * 60)
-    print(f"Tournament Name: {summary['name']}")
-    print(f"Tournament Location: {summary['location']}, {summary['country']}")
-    print(f"Time Control: {summary['timecontrol']}")
-    print(f"Total Rounds: {summary['total_rounds']}")
-    print("=" * 60)
-    
-    print("\nRound Details:")
-    for round_info in summary['rounds_info']:
-        print(f"Round {round_info['round']} ({round_info['date']}): "
-              f"{round_info['finished_games']}/{round_info['total_games']} games completed, "
-              f"{round_info['live_games']} live games")
+    # Build the whole report first and write it in one call
+    lines = [
+        "=" * 60,
+        f"Tournament Name: {summary['name']}",
+        f"Tournament Location: {summary['location']}, {summary['country']}",
+        f"Time Control: {summary['timecontrol']}",
+        f"Total Rounds: {summary['total_rounds']}",
+        "=" * 60,
+        "",
+        "Round Details:",
+    ]
+    lines.extend(
+        f"Round {round_info['round']} ({round_info['date']}): "
+        f"{round_info['finished_games']}/{round_info['total_games']} games completed, "
+        f"{round_info['live_games']} live games"
+        for round_info in summary['rounds_info']
+    )
+    sys.stdout.write('\n'.join(lines) + '\n')
 
 
 def print_player_statistics():
@@ -315,9 +499,8 @@ def print_player_statistics():
         print("Unable to get player statistics")
         return
     
-    print("=" * 80)
-    print("Player Statistics")
-    print("=" * 80)
+    # Build the whole report first and write it in one call
+    lines = ["=" * 80, "Player Statistics", "=" * 80]
     
     # Sort by total games
     sorted_players = sorted(players.items(), key=lambda x: x[1]['total_games'], reverse=True)
@@ -330,8 +513,10 @@ def print_player_statistics():
         
         if total > 0:
             win_rate = (wins + draws * 0.5) / total * 100
-            print(f"{name:20} | Total: {total:2d} | Wins: {wins:2d} | Losses: {losses:2d} | "
-                  f"Draws: {draws:2d} | Win Rate: {win_rate:5.1f}%")
+            lines.append(f"{name:20} | Total: {total:2d} | Wins: {wins:2d} | Losses: {losses:2d} | "
+                         f"Draws: {draws:2d} | Win Rate: {win_rate:5.1f}%")
+    
+    sys.stdout.write('\n'.join(lines) + '\n')
 
 
 if __name__ == "__main__":